@@ -1,4 +1,47 @@
+import collections
 import i2c
+import math
+import threading
+
+#Some builds do not provide struct (or its signed short support), in that case int.from_bytes is used instead
+try:
+    import struct
+    struct.unpack('>h', b'\0\0')
+    _HAS_STRUCT = True
+except Exception:
+    _HAS_STRUCT = False
+
+#Bound once so the polling path does not look them up on the math module every sample
+_atan2 = math.atan2
+_hypot = math.hypot
+_degrees = math.degrees
+
+#Valid modes for 3, 2 and 1 bit settings
+_MODES8 = frozenset(range(8))
+_MODES4 = frozenset(range(4))
+_MODES2 = frozenset((0, 1))
+
+#Decode big-endian signed shorts read from the sensor, fmt is the struct format matching values_read
+if _HAS_STRUCT:
+    def _unpack_int16(fmt, values_read):
+        return struct.unpack(fmt, bytes(values_read))
+else:
+    def _unpack_int16(fmt, values_read):
+        #memoryview slices do not copy the buffer
+        view = memoryview(values_read)
+        return tuple(int.from_bytes(view[i:i + 2], 'big', signed=True) for i in range(0, len(view), 2))
+
+#Builds a setter for a register field, register, mask, starting_bit and valid modes are bound once when the class is
+#created instead of being loaded on every call
+def _make_setter(register, mask, starting_bit, modes):
+    def setter(self, mode):
+        if mode not in modes:
+            raise ValueError
+        self._write_to_register(register, mask, mode, starting_bit)
+    return setter
+
+#Accelerometer sample in g, fields can be read as acc.x or unpacked as x, y, z = acc
+AccelXYZ = collections.namedtuple('AccelXYZ', 'x y z')
 
 class MyMPU:
     """Class used for the MPU-6050 sensor"""
@@ -6,6 +49,7 @@ class MyMPU:
     # Registers map                                                                                 #
     #################################################################################################
     REG_CONFIG = 0x1A
+    GYRO_CONFIG = 0x1B
     PWR_MGMT_1 = 0x6B
     PWR_MGMT_2 = 0x6C
     SIGNAL_PATH_RESET = 0x68
@@ -17,41 +61,89 @@ class MyMPU:
     #####################################################################
     # [Check section 4.17 Registers 59to64 – Accelerometer Measurements]#
     #####################################################################
-    ACCEL_SCALE = (16834.0, 8192.0, 4096.0, 2048.0)
+    #LSB/g is 16384, 8192, 4096 and 2048, the reciprocals are stored so that samples are multiplied instead of divided
+    _ACCEL_INV_SCALE = (1.0 / 16384.0, 1.0 / 8192.0, 1.0 / 4096.0, 1.0 / 2048.0)
+
+    #####################################################################
+    # Default configuration written in one burst from REG_CONFIG        #
+    #####################################################################
+    # Register     # Value # Meaning                                    #
+    # ------------ # ----- # ------------------------------------------ #
+    # REG_CONFIG   # 0x00  # FSYNC disabled, DLPF_CFG 0                 #
+    # ------------ # ----- # ------------------------------------------ #
+    # GYRO_CONFIG  # 0x00  # +/- 250 deg/s, no self test (reset value)  #
+    # ------------ # ----- # ------------------------------------------ #
+    # ACCEL_CONFIG # 0x08  # +/- 4G (AFS_SEL 1), no self test           #
+    #####################################################################
+    _DEFAULT_REGS = (REG_CONFIG, bytes([0x00, 0x00, 0x08]))
+    _DEFAULT_ACCEL_FULL_RANGE = 1
+
+    def __init__(self, i2c_name, address=0x68, clock=400000):
+        #Var to keep track of accelerometer's full range and the matching scale used on every sample
+        self._set_accel_full_range(0)
 
-    def __init__(self, i2c_name, address=0x68):
-        #Var to keep track of accelerometer's full range
-        self._accel_full_range = 0
+        #Last pitch and roll read (see get_pitch_and_roll_nonblocking)
+        self._last_pitch_and_roll = None
+        #Lock held while using the bus or changing the shadow registers, methods ending in _locked expect it to be held
+        self._lock = threading.Lock()
+
+        #Shadow copy of the configuration registers, only this driver writes them so there is no need to read them back
+        #Setters only change the shadow and mark the register as dirty, flush() writes the dirty ones to the sensor
+        self._reset_shadow()
 
         #Possible addresses for this sensor are 0x68 if AD0 is connected to GND else 0x69
         if address != 0x68 and address != 0x69:
             raise ValueError
 
         #"Port" will be used for all future transactions with the sensor
-        #Note: As per documentation, i2c clock is set to 400kHz
-        self.port = i2c.I2C(i2c_name, address, clock=400000)
-        self.port.start()
+        #Note: As per documentation, the sensor supports fast-mode i2c (400kHz). A faster clock (e.g. 1000000 for
+        #fast-mode plus) is out of spec but tolerated by many devices, if the board refuses it 400kHz is used instead
+        #Slower clocks are never raised to 400kHz, their errors are passed on
+        self.port = None
+        try:
+            self.port = i2c.I2C(i2c_name, address, clock=clock)
+            self.port.start()
+        except Exception:
+            if clock <= 400000:
+                raise
+            #Release the first port (if it was created) before opening the bus again
+            if self.port is not None:
+                try:
+                    self.port.stop()
+                except Exception:
+                    pass
+            self.port = i2c.I2C(i2c_name, address, clock=400000)
+            self.port.start()
 
         #Set sensor to default parameters
         self.configure_sensor_to_default()
+        self.flush()
 
     def close(self):
-        self.port.stop()
+        self._lock.acquire()
+        try:
+            self._flush_locked()
+            self.port.stop()
+        finally:
+            self._lock.release()
 
     def configure_sensor_to_default(self):
         #It is suggested to use the gyroscope clock
         self.set_clock_source(1)
-        #We only need 4G for scale
-        self.set_accelerometer_scale(1)
-        #The mpu6050 does not usually have the FSYNC pin, therefore it is left to 0
-        self.set_external_sync(0)
-
-    @staticmethod
-    def _twos_comp_to_int(val, bits):
-        """compute the 2's complement of int value val"""
-        if (val & (1 << (bits - 1))) != 0:  # if sign bit is set e.g., 8bit: 128-255
-            val = val - (1 << bits)  # compute negative value
-        return val  # return positive value as is
+        #PWR_MGMT_1 resets with the sleep bit set, the sensor has to be woken up to take samples
+        self.set_sleep(0)
+        #We only need 4G for scale and the mpu6050 does not usually have the FSYNC pin, therefore it is left to 0
+        #REG_CONFIG, GYRO_CONFIG and ACCEL_CONFIG are adjacent so flush() writes them in a single transaction
+        #The scale is changed together with ACCEL_CONFIG so that a sample read in between uses matching values
+        self._lock.acquire()
+        try:
+            self._set_registers_locked(*MyMPU._DEFAULT_REGS)
+            self._set_accel_full_range(MyMPU._DEFAULT_ACCEL_FULL_RANGE)
+            #The sensor is not reset here, so after an MCU reboot PWR_MGMT_2 may still hold a previous session's
+            #value. The shadow one (reset value) is written too, next to PWR_MGMT_1 so that it is the same transaction
+            self._dirty.add(MyMPU.PWR_MGMT_2)
+        finally:
+            self._lock.release()
 
     def _reset_register(self, register):
         #####################################################################
@@ -62,15 +154,73 @@ class MyMPU:
         #####################################################################
         self.port.write_bytes(register, 0x00)
 
+    def _reset_shadow(self):
+        #####################################################################
+        # [Check section 3 – Note]                                          #
+        #####################################################################
+        # "The reset value is 0x00 for all registers other than the         #
+        # registers below" (PWR_MGMT_1 resets to 0x40)                      #
+        #####################################################################
+        self._shadow = {
+            MyMPU.REG_CONFIG: 0x00,
+            MyMPU.GYRO_CONFIG: 0x00,
+            MyMPU.ACCEL_CONFIG: 0x00,
+            MyMPU.PWR_MGMT_1: 0x40,
+            MyMPU.PWR_MGMT_2: 0x00,
+        }
+        #Registers changed since the last flush
+        self._dirty = set()
+
+    def _set_registers_locked(self, start_register, values):
+        #values[i] is the new value of start_register + i
+        for i in range(len(values)):
+            self._shadow[start_register + i] = values[i]
+            self._dirty.add(start_register + i)
+
+    def flush(self):
+        self._lock.acquire()
+        try:
+            self._flush_locked()
+        finally:
+            self._lock.release()
+
+    def _flush_locked(self):
+        #Writes the registers changed since the last flush in register order
+        #The sensor auto-increments the register address after each byte, so each run of adjacent registers is
+        #written in a single transaction
+        if not self._dirty:
+            return
+        registers = sorted(self._dirty)
+        start = 0
+        for i in range(1, len(registers) + 1):
+            if i < len(registers) and registers[i] == registers[i - 1] + 1:
+                continue
+            first = registers[start]
+            if i - start == 1:
+                self.port.write_bytes(first, self._shadow[first])
+            else:
+                #One int argument per byte, like every other write_bytes call
+                self.port.write_bytes(first, *[self._shadow[r] for r in registers[start:i]])
+            #A run is only cleared once written, so if a write fails the remaining changes can be flushed again
+            #Setters wait for the lock, so no register can be changed again between its write and this discard
+            for r in registers[start:i]:
+                self._dirty.discard(r)
+            start = i
+
     def _write_to_register(self, register, mask, value, starting_bit):
-        # Read the current value from the register
-        value_read = self.port.write_read(register, n=1)[0]
-        # Apply mask on read value
-        value_read &= mask
-        # Set bits from starting_bit
-        value_read |= (value << starting_bit)
-        # Write the new values to register
-        self.port.write_bytes(register, value)
+        self._lock.acquire()
+        try:
+            self._write_to_register_locked(register, mask, value, starting_bit)
+        finally:
+            self._lock.release()
+
+    def _write_to_register_locked(self, register, mask, value, starting_bit):
+        #Note: mask has 0s on the bits owned by the setting and 1s on the bits to keep
+        # Bits to set, clipped to the setting's field so an out of range value can not leak into other fields
+        set_bits = (value << starting_bit) & ~mask & 0xFF
+        # Keep the unrelated bits of the shadowed value and set the new ones, the register is written on flush()
+        self._shadow[register] = (self._shadow[register] & mask) | set_bits
+        self._dirty.add(register)
 
     def set_accelerometer_scale(self, mode):
         #####################################################################
@@ -87,7 +237,7 @@ class MyMPU:
         # 3    # +/- 16G                                                    #
         #####################################################################
 
-        if mode not in (0, 1, 2, 3):
+        if mode not in _MODES4:
             raise ValueError
 
         #########################################################
@@ -98,179 +248,208 @@ class MyMPU:
         # XA_ST| XA_ST| XA_ST|  AFS_SEL    |        --          #
         #########################################################
 
-        self._write_to_register(MyMPU.ACCEL_CONFIG, 0b11100111, mode, 3)
-        self._accel_full_range = mode
+        #The scale is changed together with the register so that a sample read in between uses matching values
+        self._lock.acquire()
+        try:
+            self._write_to_register_locked(MyMPU.ACCEL_CONFIG, 0b11100111, mode, 3)
+            self._set_accel_full_range(mode)
+        finally:
+            self._lock.release()
 
-    def get_accelerometer_values(self):
+    def _set_accel_full_range(self, mode):
+        #The scale is looked up here, once per change, so that reading a sample only loads self._inv_scale
+        self._accel_full_range = mode
+        self._inv_scale = MyMPU._ACCEL_INV_SCALE[mode]
+
+    def read_all(self):
+        #####################################################################
+        # [Check sections 4.17 to 4.19 Registers 59 to 72]                  #
+        #####################################################################
+        # Registers # Content                                               #
+        # --------- # ----------------------------------------------------- #
+        # 59 to 64  # ACCEL_XOUT, ACCEL_YOUT, ACCEL_ZOUT                    #
+        # --------- # ----------------------------------------------------- #
+        # 65 to 66  # TEMP_OUT                                              #
+        # --------- # ----------------------------------------------------- #
+        # 67 to 72  # GYRO_XOUT, GYRO_YOUT, GYRO_ZOUT                       #
+        #####################################################################
+        #The registers are contiguous so the 7 values (2 bytes each) are read in a single 14 bytes transaction
+        #Note: the register pointer has to be sent every time, the sensor auto-increments it while reading so after a
+        #read it points past GYRO_ZOUT_L (and any setter moves it too). write_read already uses a repeated start
+        #between the pointer write and the read, so there is no extra STOP/START to save
+        self._lock.acquire()
+        try:
+            if self._dirty:
+                self._flush_locked()
+            values_read = self.port.write_read(MyMPU.ACCEL_FIRST_REGISTER, n=14)
+        finally:
+            self._lock.release()
+        #First byte is high and second low and, as per documentation, they are in 2's complement
+        #so each value is a big-endian signed short
+        #Returns the raw (ax, ay, az, temp, gx, gy, gz)
+        return _unpack_int16(">hhhhhhh", values_read)
+
+    def _read_raw_int16(self):
         #####################################################################
         # [Check section 4.17 Registers 59to64 – Accelerometer Measurements]#
         #####################################################################
-        #Each value is made of 2 bytes and we have 3 axis => 6 bytes to read
-        values_read = self.port.write_read(MyMPU.ACCEL_FIRST_REGISTER, n=6)
-        #First byte is high and second low so we shift to the left by 8 bits and place it in "or" to get the full value
-        x = values_read[0] << 8 | values_read[1]
-        y = values_read[2] << 8 | values_read[3]
-        z = values_read[4] << 8 | values_read[5]
-        #As per documentation, they are in 2's complement so we need to convert them
-        x = self._twos_comp_to_int(val=x, bits=16)
-        y = self._twos_comp_to_int(val=y, bits=16)
-        z = self._twos_comp_to_int(val=z, bits=16)
+        #Each value is made of 2 bytes and we have 3 axis => 6 bytes to read, big-endian signed shorts as in read_all
+        #Pending configuration is written first so that the sample reflects it, self._lock is held by the caller
+        if self._dirty:
+            self._flush_locked()
+        return _unpack_int16(">hhh", self.port.write_read(MyMPU.ACCEL_FIRST_REGISTER, n=6))
+
+    def _read_accel_raw(self):
+        x, y, z = self._read_raw_int16()
         #We now need to scale them
-        accel_scale = MyMPU.ACCEL_SCALE[self._accel_full_range]
+        s = self._inv_scale
+        return x * s, y * s, z * s
 
-        x = x / accel_scale
-        y = y / accel_scale
-        z = z / accel_scale
+    def get_accelerometer_values(self):
+        self._lock.acquire()
+        try:
+            return AccelXYZ(*self._read_accel_raw())
+        finally:
+            self._lock.release()
 
-        return {'x': x, 'y': y, 'z': z}
-        
     def get_pitch_and_roll(self):
-        import math
-        
-        acc = self.get_accelerometer_values()
-        x = acc['x']
-        y = acc['y']
-        z = acc['z']
-        
-        pitch = int(math.atan( x / ( math.sqrt(y * y + z * z) ) ) * 180 / 3.14)
-        roll = int(math.atan( y / ( math.sqrt(x * x + z * z) ) ) * 180 / 3.14)
-        return {'pitch': pitch, 'roll': roll}
-
-    def set_digital_low_pass_filter(self, mode):
-        #####################################################################
-        # [Check section 4.3 Register 26 – Configuration]                   #
-        #####################################################################
-        #      # Accelerometer         # Gyroscope                          #
-        # ---- # --------------------- # ---------- | --------- | --------- #
-        # Mode # Bandwidth  | Delay    # Bandwidth  | Delay     | Fs        #
-        # ---- # ---------- | -------- # ---------- | --------- | --------- #
-        # 0    # 260        | 0        # 256        | 0.98      | 8         #
-        # ---- # ---------- | -------- # ---------- | --------- | --------- #
-        # 1    # 184        | 2.0      # 188        | 1.9       | 1         #
-        # ---- # ---------- | -------- # ---------- | --------- | --------- #
-        # 2    # 94         | 3.0      # 98         | 2.8       | 1         #
-        # ---- # ---------- | -------- # ---------- | --------- | --------- #
-        # 3    # 44         | 4.9      # 42         | 4.8       | 1         #
-        # ---- # ---------- | -------- # ---------- | --------- | --------- #
-        # 4    # 21         | 8.5      # 20         | 8.3       | 1         #
-        # ---- # ---------- | -------- # ---------- | --------- | --------- #
-        # 5    # 10         | 13.8     # 10         | 13.4      | 1         #
-        # ---- # ---------- | -------- # ---------- | --------- | --------- #
-        # 6    # 5          | 19.0     # 5          | 18.6      | 1         #
-        # ---- # --------------------- # ---------------------- | --------- #
-        # 7    # Reserved              # Reserved               | 8         #
-        #####################################################################
-
-        if mode not in (0, 1, 2, 3, 4, 5, 6, 7):
-            raise ValueError
-
-        #########################################################
-        # REG_CONFIG register:                                  #
-        #########################################################
-        # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
-        # ----------------------------------------------------- #
-        #  --  |  --  | EXT_SYNC_SET       | DLPF_CFG           #
-        #########################################################
-
-        self._write_to_register(MyMPU.REG_CONFIG, 0b11111000, mode, 0)
-
-    def set_external_sync(self, mode):
-        #####################################################################
-        # [Check section 4.3 Register 26 – Configuration]                   #
-        #####################################################################
-        # Mode # FSYNC Bit Location                                         #
-        # ---- # ---------------------------------------------------------- #
-        # 0    # Input disabled                                             #
-        # ---- # ---------------------------------------------------------- #
-        # 1    # TEMP_OUT_L[0]                                              #
-        # ---- # ---------------------------------------------------------- #
-        # 2    # GYRO_XOUT_L[0]                                             #
-        # ---- # ---------------------------------------------------------- #
-        # 3    # GYRO_YOUT_L[0]                                             #
-        # ---- # ---------------------------------------------------------- #
-        # 4    # GYRO_ZOUT_L[0]                                             #
-        # ---- # ---------------------------------------------------------- #
-        # 5    # ACCEL_XOUT_L[0]                                            #
-        # ---- # ---------------------------------------------------------- #
-        # 6    # ACCEL_YOUT_L[0]                                            #
-        # ---- # ---------------------------------------------------------- #
-        # 7    # ACCEL_ZOUT_L[0]                                            #
-        #####################################################################
-
-        if mode not in (0, 1, 2, 3, 4, 5, 6, 7):
-            raise ValueError
-
-        #########################################################
-        # REG_CONFIG register:                                  #
-        #########################################################
-        # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
-        # ----------------------------------------------------- #
-        #  --  |  --  | EXT_SYNC_SET       | DLPF_CFG           #
-        #########################################################
-
-        self._write_to_register(MyMPU.REG_CONFIG, 0b11000111, mode, 3)
-
-    def set_clock_source(self, mode):
-        #####################################################################
-        # [Check section 4.28 Register 107 – Power Management 1]            #
-        #####################################################################
-        # Mode # Clock Source                                               #
-        # ---- # ---------------------------------------------------------- #
-        # 0    # Internal 8MHz oscillator                                   #
-        # ---- # ---------------------------------------------------------- #
-        # 1    # PLL with X axis gyroscope reference                        #
-        # ---- # ---------------------------------------------------------- #
-        # 2    # PLL with Y axis gyroscope reference                        #
-        # ---- # ---------------------------------------------------------- #
-        # 3    # PLL with Z axis gyroscope reference                        #
-        # ---- # ---------------------------------------------------------- #
-        # 4    # PLL with external 32.768kHz reference                      #
-        # ---- # ---------------------------------------------------------- #
-        # 5    # PLL with external 19.2MHz reference                        #
-        # ---- # ---------------------------------------------------------- #
-        # 6    # Reserved                                                   #
-        # ---- # ---------------------------------------------------------- #
-        # 7    # Stops the clock and keeps the timing generator in reset    #
-        #####################################################################
-
-        if mode not in (0, 1, 2, 3, 4, 5, 6, 7):
-            raise ValueError
-
-        #########################################################
-        # PWR_MGMT_1:                                           #
-        #########################################################
-        # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
-        # ----------------------------------------------------- #
-        # reset| sleep| cycle|  --  | t_dis| CLKSEL             #
-        #########################################################
+        self._lock.acquire()
+        try:
+            return self._read_pitch_and_roll()
+        finally:
+            self._lock.release()
+
+    def get_pitch_and_roll_nonblocking(self):
+        #If another thread is in the middle of a read, the last values are returned (None if there are none yet)
+        #instead of waiting for the bus
+        if not self._lock.acquire(False):
+            return self._last_pitch_and_roll
+        try:
+            return self._read_pitch_and_roll()
+        finally:
+            self._lock.release()
+
+    def _read_pitch_and_roll(self):
+        #Must be called with self._lock held
+        #Only the ratios between the axes matter so the raw values are used, the scale would cancel out
+        x, y, z = self._read_raw_int16()
+
+        #atan2 does not divide so it also works when the other two axes read 0
+        pitch = int(_degrees(_atan2(x, _hypot(y, z))))
+        roll = int(_degrees(_atan2(y, _hypot(x, z))))
+        self._last_pitch_and_roll = {'pitch': pitch, 'roll': roll}
+        return self._last_pitch_and_roll
 
-        self._write_to_register(MyMPU.PWR_MGMT_1, 0b11111000, mode, 0)
-
-    def set_sleep(self, mode):
-        #####################################################################
-        # [Check section 4.28 Register 107 – Power Management 1]            #
-        #####################################################################
+    #####################################################################
+    # [Check section 4.3 Register 26 – Configuration]                   #
+    #####################################################################
+    #      # Accelerometer         # Gyroscope                          #
+    # ---- # --------------------- # ---------- | --------- | --------- #
+    # Mode # Bandwidth  | Delay    # Bandwidth  | Delay     | Fs        #
+    # ---- # ---------- | -------- # ---------- | --------- | --------- #
+    # 0    # 260        | 0        # 256        | 0.98      | 8         #
+    # ---- # ---------- | -------- # ---------- | --------- | --------- #
+    # 1    # 184        | 2.0      # 188        | 1.9       | 1         #
+    # ---- # ---------- | -------- # ---------- | --------- | --------- #
+    # 2    # 94         | 3.0      # 98         | 2.8       | 1         #
+    # ---- # ---------- | -------- # ---------- | --------- | --------- #
+    # 3    # 44         | 4.9      # 42         | 4.8       | 1         #
+    # ---- # ---------- | -------- # ---------- | --------- | --------- #
+    # 4    # 21         | 8.5      # 20         | 8.3       | 1         #
+    # ---- # ---------- | -------- # ---------- | --------- | --------- #
+    # 5    # 10         | 13.8     # 10         | 13.4      | 1         #
+    # ---- # ---------- | -------- # ---------- | --------- | --------- #
+    # 6    # 5          | 19.0     # 5          | 18.6      | 1         #
+    # ---- # --------------------- # ---------------------- | --------- #
+    # 7    # Reserved              # Reserved               | 8         #
+    #####################################################################
+    #########################################################
+    # REG_CONFIG register:                                  #
+    #########################################################
+    # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
+    # ----------------------------------------------------- #
+    #  --  |  --  | EXT_SYNC_SET       | DLPF_CFG           #
+    #########################################################
+    set_digital_low_pass_filter = _make_setter(REG_CONFIG, 0b11111000, 0, _MODES8)
 
-        if mode not in (0, 1):
-            raise ValueError
+    #####################################################################
+    # [Check section 4.3 Register 26 – Configuration]                   #
+    #####################################################################
+    # Mode # FSYNC Bit Location                                         #
+    # ---- # ---------------------------------------------------------- #
+    # 0    # Input disabled                                             #
+    # ---- # ---------------------------------------------------------- #
+    # 1    # TEMP_OUT_L[0]                                              #
+    # ---- # ---------------------------------------------------------- #
+    # 2    # GYRO_XOUT_L[0]                                             #
+    # ---- # ---------------------------------------------------------- #
+    # 3    # GYRO_YOUT_L[0]                                             #
+    # ---- # ---------------------------------------------------------- #
+    # 4    # GYRO_ZOUT_L[0]                                             #
+    # ---- # ---------------------------------------------------------- #
+    # 5    # ACCEL_XOUT_L[0]                                            #
+    # ---- # ---------------------------------------------------------- #
+    # 6    # ACCEL_YOUT_L[0]                                            #
+    # ---- # ---------------------------------------------------------- #
+    # 7    # ACCEL_ZOUT_L[0]                                            #
+    #####################################################################
+    #########################################################
+    # REG_CONFIG register:                                  #
+    #########################################################
+    # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
+    # ----------------------------------------------------- #
+    #  --  |  --  | EXT_SYNC_SET       | DLPF_CFG           #
+    #########################################################
+    #Note: mask only clears EXT_SYNC_SET (bits 5:3), DLPF_CFG (bits 2:0) is left unchanged
+    set_external_sync = _make_setter(REG_CONFIG, 0b11000111, 3, _MODES8)
 
-        #########################################################
-        # PWR_MGMT_1:                                           #
-        #########################################################
-        # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
-        # ----------------------------------------------------- #
-        # reset| sleep| cycle|  --  | t_dis| CLKSEL             #
-        #########################################################
+    #####################################################################
+    # [Check section 4.28 Register 107 – Power Management 1]            #
+    #####################################################################
+    # Mode # Clock Source                                               #
+    # ---- # ---------------------------------------------------------- #
+    # 0    # Internal 8MHz oscillator                                   #
+    # ---- # ---------------------------------------------------------- #
+    # 1    # PLL with X axis gyroscope reference                        #
+    # ---- # ---------------------------------------------------------- #
+    # 2    # PLL with Y axis gyroscope reference                        #
+    # ---- # ---------------------------------------------------------- #
+    # 3    # PLL with Z axis gyroscope reference                        #
+    # ---- # ---------------------------------------------------------- #
+    # 4    # PLL with external 32.768kHz reference                      #
+    # ---- # ---------------------------------------------------------- #
+    # 5    # PLL with external 19.2MHz reference                        #
+    # ---- # ---------------------------------------------------------- #
+    # 6    # Reserved                                                   #
+    # ---- # ---------------------------------------------------------- #
+    # 7    # Stops the clock and keeps the timing generator in reset    #
+    #####################################################################
+    #########################################################
+    # PWR_MGMT_1:                                           #
+    #########################################################
+    # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
+    # ----------------------------------------------------- #
+    # reset| sleep| cycle|  --  | t_dis| CLKSEL             #
+    #########################################################
+    set_clock_source = _make_setter(PWR_MGMT_1, 0b11111000, 0, _MODES8)
 
-        self._write_to_register(MyMPU.PWR_MGMT_1, 0b10111111, mode, 6)
+    #####################################################################
+    # [Check section 4.28 Register 107 – Power Management 1]            #
+    #####################################################################
+    #########################################################
+    # PWR_MGMT_1:                                           #
+    #########################################################
+    # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
+    # ----------------------------------------------------- #
+    # reset| sleep| cycle|  --  | t_dis| CLKSEL             #
+    #########################################################
+    set_sleep = _make_setter(PWR_MGMT_1, 0b10111111, 6, _MODES2)
 
     def reset_device(self):
         #####################################################################
         # [Check section 4.28 Register 107 – Power Management 1]            #
         #####################################################################
 
-        mode = 1
-
         #########################################################
         # PWR_MGMT_1:                                           #
         #########################################################
@@ -279,17 +458,29 @@ class MyMPU:
         # reset| sleep| cycle|  --  | t_dis| CLKSEL             #
         #########################################################
 
-        self._write_to_register(MyMPU.PWR_MGMT_1, 0b01111111, mode, 7)
-
-        #####################################################################
-        # [Check section 4.28 Register 107 – Power Management 1: Notes]     #
-        #####################################################################
-        # [Check section 4.26 Register 104 – Signal Path Reset]             #
-        #####################################################################
-
-        sleep(100)
-        self._write_to_register(MyMPU.SIGNAL_PATH_RESET, 0b11111000, 7, 0)
-        sleep(100)
+        #The lock is held for the whole reset so that no read or flush runs while the device is resetting
+        self._lock.acquire()
+        try:
+            #Only the reset bit is written, the other bits are reset by the device anyway so there is no need to merge
+            #them with the shadowed value
+            self.port.write_bytes(MyMPU.PWR_MGMT_1, 0x80)
+
+            #####################################################################
+            # [Check section 4.28 Register 107 – Power Management 1: Notes]     #
+            #####################################################################
+            # [Check section 4.26 Register 104 – Signal Path Reset]             #
+            #####################################################################
+
+            #Note: sleep is a Zerynth builtin so it does not need to be imported
+            sleep(100)
+            #GYRO_RESET, ACCEL_RESET and TEMP_RESET, the register is write only so nothing is read back
+            self.port.write_bytes(MyMPU.SIGNAL_PATH_RESET, 0x07)
+            sleep(100)
+            #The device is now back to its reset values, changes not flushed yet are discarded
+            self._reset_shadow()
+            self._set_accel_full_range(0)
+        finally:
+            self._lock.release()
 
     def set_temp_on(self):
         self._set_temp_on_off(0)
@@ -297,105 +488,81 @@ class MyMPU:
     def set_temp_off(self):
         self._set_temp_on_off(1)
 
-    def _set_temp_on_off(self, mode):
-        #####################################################################
-        # [Check section 4.28 Register 107 – Power Management 1]            #
-        #####################################################################
-
-        if mode not in (0, 1):
-            raise ValueError
-
-        #########################################################
-        # PWR_MGMT_1:                                           #
-        #########################################################
-        # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
-        # ----------------------------------------------------- #
-        # reset| sleep| cycle|  --  | t_dis| CLKSEL             #
-        #########################################################
-
-        self._write_to_register(MyMPU.PWR_MGMT_1, 0b11110111, mode, 3)
-
-    def set_cycle(self, mode):
-        #####################################################################
-        # [Check section 4.28 Register 107 – Power Management 1]            #
-        #####################################################################
-
-        if mode not in (0, 1):
-            raise ValueError
-
-        #########################################################
-        # PWR_MGMT_1:                                           #
-        #########################################################
-        # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
-        # ----------------------------------------------------- #
-        # reset| sleep| cycle|  --  | t_dis| CLKSEL             #
-        #########################################################
-
-        self._write_to_register(MyMPU.PWR_MGMT_1, 0b11011111, mode, 5)
-
-    def set_gyro_axis_on_off(self, mode):
-        #####################################################################
-        # [Check section 4.29 Register 108 – Power Management 2]            #
-        #####################################################################
-        # Mode # Gyro axis disabled                                         #
-        # ---- # ---------------------------------------------------------- #
-        # 0    # None                                                       #
-        # ---- # ---------------------------------------------------------- #
-        # 1    # Z axis                                                     #
-        # ---- # ---------------------------------------------------------- #
-        # 2    # Y axis                                                     #
-        # ---- # ---------------------------------------------------------- #
-        # 3    # Z, Y axis                                                  #
-        # ---- # ---------------------------------------------------------- #
-        # 4    # X axis                                                     #
-        # ---- # ---------------------------------------------------------- #
-        # 5    # X, Z axis                                                  #
-        # ---- # ---------------------------------------------------------- #
-        # 6    # X, Y axis                                                  #
-        # ---- # ---------------------------------------------------------- #
-        # 7    # X, Y, Z axis                                               #
-        #####################################################################
-
-        if mode not in (0, 1, 2, 3, 4, 5, 6, 7):
-            raise ValueError
-
-        #########################################################
-        # PWR_MGMT_2:                                           #
-        #########################################################
-        # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
-        # ----------------------------------------------------- #
-        # LP_WAKE_CTRL| SB_XA| SB_YA| SB_ZA| SB_ZG| SB_ZG| SB_ZG#
-        #########################################################
-
-        self._write_to_register(MyMPU.PWR_MGMT_2, 0b11111000, mode, 0)
-
-    def _set_low_power_wake_up_frequency(self, mode):
-        #####################################################################
-        # [Check section 4.29 Register 108 – Power Management 2]            #
-        #####################################################################
-        # Mode # Wake-up frequency                                          #
-        # ---- # ---------------------------------------------------------- #
-        # 0    # 1.25 Hz                                                    #
-        # ---- # ---------------------------------------------------------- #
-        # 1    # 5.0 Hz                                                     #
-        # ---- # ---------------------------------------------------------- #
-        # 2    # 20 Hz                                                      #
-        # ---- # ---------------------------------------------------------- #
-        # 3    # 40 Hz                                                      #
-        #####################################################################
+    #####################################################################
+    # [Check section 4.28 Register 107 – Power Management 1]            #
+    #####################################################################
+    #########################################################
+    # PWR_MGMT_1:                                           #
+    #########################################################
+    # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
+    # ----------------------------------------------------- #
+    # reset| sleep| cycle|  --  | t_dis| CLKSEL             #
+    #########################################################
+    _set_temp_on_off = _make_setter(PWR_MGMT_1, 0b11110111, 3, _MODES2)
 
-        if mode not in (0, 1, 2, 3):
-            raise ValueError
+    #####################################################################
+    # [Check section 4.28 Register 107 – Power Management 1]            #
+    #####################################################################
+    #########################################################
+    # PWR_MGMT_1:                                           #
+    #########################################################
+    # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
+    # ----------------------------------------------------- #
+    # reset| sleep| cycle|  --  | t_dis| CLKSEL             #
+    #########################################################
+    set_cycle = _make_setter(PWR_MGMT_1, 0b11011111, 5, _MODES2)
 
-        #########################################################
-        # PWR_MGMT_2:                                           #
-        #########################################################
-        # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
-        # ----------------------------------------------------- #
-        # LP_WAKE_CTRL| SB_XA| SB_YA| SB_ZA| SB_ZG| SB_ZG| SB_ZG#
-        #########################################################
+    #####################################################################
+    # [Check section 4.29 Register 108 – Power Management 2]            #
+    #####################################################################
+    # Mode # Gyro axis disabled                                         #
+    # ---- # ---------------------------------------------------------- #
+    # 0    # None                                                       #
+    # ---- # ---------------------------------------------------------- #
+    # 1    # Z axis                                                     #
+    # ---- # ---------------------------------------------------------- #
+    # 2    # Y axis                                                     #
+    # ---- # ---------------------------------------------------------- #
+    # 3    # Z, Y axis                                                  #
+    # ---- # ---------------------------------------------------------- #
+    # 4    # X axis                                                     #
+    # ---- # ---------------------------------------------------------- #
+    # 5    # X, Z axis                                                  #
+    # ---- # ---------------------------------------------------------- #
+    # 6    # X, Y axis                                                  #
+    # ---- # ---------------------------------------------------------- #
+    # 7    # X, Y, Z axis                                               #
+    #####################################################################
+    #########################################################
+    # PWR_MGMT_2:                                           #
+    #########################################################
+    # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
+    # ----------------------------------------------------- #
+    # LP_WAKE_CTRL| SB_XA| SB_YA| SB_ZA| SB_ZG| SB_ZG| SB_ZG#
+    #########################################################
+    set_gyro_axis_on_off = _make_setter(PWR_MGMT_2, 0b11111000, 0, _MODES8)
 
-        self._write_to_register(MyMPU.PWR_MGMT_2, 0b00111111, mode, 6)
+    #####################################################################
+    # [Check section 4.29 Register 108 – Power Management 2]            #
+    #####################################################################
+    # Mode # Wake-up frequency                                          #
+    # ---- # ---------------------------------------------------------- #
+    # 0    # 1.25 Hz                                                    #
+    # ---- # ---------------------------------------------------------- #
+    # 1    # 5.0 Hz                                                     #
+    # ---- # ---------------------------------------------------------- #
+    # 2    # 20 Hz                                                      #
+    # ---- # ---------------------------------------------------------- #
+    # 3    # 40 Hz                                                      #
+    #####################################################################
+    #########################################################
+    # PWR_MGMT_2:                                           #
+    #########################################################
+    # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
+    # ----------------------------------------------------- #
+    # LP_WAKE_CTRL| SB_XA| SB_YA| SB_ZA| SB_ZG| SB_ZG| SB_ZG#
+    #########################################################
+    _set_low_power_wake_up_frequency = _make_setter(PWR_MGMT_2, 0b00111111, 6, _MODES4)
 
     def set_low_power_accelerometer_only_off(self):
         #Note: Function sets the sensor to awake mode (sleep mode to 0)
@@ -418,20 +585,40 @@ class MyMPU:
         self._set_low_power_accelerometer_only_off_on(1, frequency)
 
     def _set_low_power_accelerometer_only_off_on(self, mode, frequency):
-        if mode not in (0, 1):
+        if mode not in _MODES2:
             raise ValueError
 
-        if frequency not in (0, 1, 2, 3):
+        if frequency not in _MODES4:
             raise ValueError
 
-        if mode == 0:
-            self.set_cycle(0)
-            self.set_sleep(0)
-            self.set_temp_on()
-            self.set_gyro_axis_on_off(0)
-        else:
-            self.set_cycle(1)
-            self.set_sleep(0)
-            self.set_temp_off()
-            self.set_gyro_axis_on_off(7)
-            self._set_low_power_wake_up_frequency(frequency)
+        #########################################################
+        # PWR_MGMT_1:                                           #
+        #########################################################
+        # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
+        # ----------------------------------------------------- #
+        # reset| sleep| cycle|  --  | t_dis| CLKSEL             #
+        #########################################################
+        # PWR_MGMT_2:                                           #
+        #########################################################
+        # Bit7 | Bit6 | Bit5 | Bit4 | Bit3 | Bit2 | Bit1 | Bit0 #
+        # ----------------------------------------------------- #
+        # LP_WAKE_CTRL| SB_XA| SB_YA| SB_ZA| SB_ZG| SB_ZG| SB_ZG#
+        #########################################################
+
+        #Same result as calling set_cycle, set_sleep(0), the temperature setter, set_gyro_axis_on_off and (when on)
+        #_set_low_power_wake_up_frequency, but PWR_MGMT_1 and PWR_MGMT_2 are adjacent so both are written at once
+        #Sleep is always cleared, cycle and t_dis follow mode
+        #The lock is held from reading the shadow to updating it so that no setter change is lost in between
+        self._lock.acquire()
+        try:
+            pwr_mgmt_1 = (self._shadow[MyMPU.PWR_MGMT_1] & 0b10010111) | (mode << 5) | (mode << 3)
+            if mode == 0:
+                #All gyro axes on, wake-up frequency unchanged
+                pwr_mgmt_2 = self._shadow[MyMPU.PWR_MGMT_2] & 0b11111000
+            else:
+                #All gyro axes in standby, wake-up frequency set
+                pwr_mgmt_2 = (self._shadow[MyMPU.PWR_MGMT_2] & 0b00111000) | (frequency << 6) | 0b111
+
+            self._set_registers_locked(MyMPU.PWR_MGMT_1, bytes([pwr_mgmt_1, pwr_mgmt_2]))
+        finally:
+            self._lock.release()
@@ -1,4 +1,5 @@
 import streams
+import timers
 streams.serial()
 
 class Manager:
@@ -10,18 +11,26 @@ class Manager:
         self.accelerometer = MyMPU.MyMPU(i2c_name)
         #Enable low-power mode
         self.accelerometer.set_low_power_accelerometer_only_on()
+        self.timer = None
 
-    def start_blocking(self):
-        """Start the application's main loop"""
-        while True:
-            #Get pitch and roll from accelerometer every 500 msec
-            acc = self.accelerometer.get_pitch_and_roll()
-            pitch = acc["pitch"]
-            roll = acc["roll"]
+    def start(self):
+        """Start polling the accelerometer, returns immediately leaving the main thread free"""
+        #The timer keeps a steady 500 msec period, unlike sleeping after each read which adds the read time to it
+        self.timer = timers.timer()
+        self.timer.start()
+        self.timer.interval(500, self._tick)
 
-            print("Pitch: ", pitch, "Roll: ", roll)
-            sleep(500)
+    def _tick(self):
+        #Get pitch and roll from accelerometer every 500 msec
+        acc = self.accelerometer.get_pitch_and_roll_nonblocking()
+        #None if the previous read is still in progress and no value has been read yet
+        if acc is None:
+            return
+        pitch = acc["pitch"]
+        roll = acc["roll"]
+
+        print("Pitch: ", pitch, "Roll: ", roll)
 
 
 manager = Manager(I2C2)
-manager.start_blocking()
+manager.start()